@@ -303,28 +303,35 @@ def process_futures_into_list(future_list, raise_on_error=True, check_results=Tr
     output_list = [None] * len(future_list)
     complete_gen = distributed.as_completed(future_list)
 
-    for finished_future in complete_gen:
+    # Take whatever has finished in batches so that the results can be gathered in one bulk fetch
+    for finished_batch in complete_gen.batches():
 
         DaskController.check_cluster_state()
+        successful_futures = []
 
-        # Jobs can be cancelled in certain situations
-        if check_results and (finished_future.cancelled() or (finished_future.status == "erred")):
-            error = finished_future.exception()
-            utils.Debug.vprint("Restarting job (Error: {er})".format(er=error), level=0)
+        for finished_future in finished_batch:
 
-            # Restart cancelled futures and put them back into the work pile
-            try:
-                DaskController.client.retry(finished_future)
-                complete_gen.update([finished_future])
-            except KeyError:
-                if raise_on_error:
-                    raise
+            # Jobs can be cancelled in certain situations
+            if check_results and (finished_future.cancelled() or (finished_future.status == "erred")):
+                error = finished_future.exception()
+                utils.Debug.vprint("Restarting job (Error: {er})".format(er=error), level=0)
+
+                # Restart cancelled futures and put them back into the work pile
+                try:
+                    DaskController.client.retry(finished_future)
+                    complete_gen.update([finished_future])
+                except KeyError:
+                    if raise_on_error:
+                        raise
+
+            else:
+                successful_futures.append(finished_future)
 
         # In the event of success, get the data
-        else:
-            i, result_data = finished_future.result()
+        for i, result_data in DaskController.client.gather(successful_futures):
             output_list[i] = result_data
-            finished_future.cancel()
+
+        DaskController.client.cancel(successful_futures)
 
     return output_list
 
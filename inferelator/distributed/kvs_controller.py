@@ -14,7 +14,11 @@ from inferelator import default
 import os
 import warnings
 import collections
+import collections.abc
+import functools
+import itertools
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Use cPickle in python 2
 try:
@@ -41,6 +45,15 @@ POST_SYNC = "post_sync"
 PILEUP_DATA = "data_pileup"
 FINAL_DATA = "final_data"
 
+# Maximum number of simultaneous connections used by the master to pile up results
+MAX_PILEUP_CONNECTIONS = 32
+
+# Maximum multiple of the starting chunk size that ownCheck will grow to
+MAX_CHUNK_GROWTH = 8
+
+# Pickled data larger than this (in bytes) is passed through a temp file instead of through the KVS
+MAX_KVS_PAYLOAD_SIZE = 64 * 1024 ** 2
+
 
 class KVSController(AbstractController):
 
@@ -49,6 +62,19 @@ class KVSController(AbstractController):
     chunk = 25
     _controller_name = "kvs"
 
+    # Arguments used to connect to the KVS server (so that more connections can be opened later)
+    _connect_args = None
+
+    # Extra KVSClient objects that are kept open for concurrent gets
+    _connection_pool = None
+
+    # Number of map calls so far; every process calls map in the same order so this is the same everywhere
+    _map_calls = 0
+
+    # Skip the KVS entirely if there's only one process
+    # Turning this off runs a single process through the KVS server like any other (this is how it gets tested)
+    single_task_bypass = True
+
     # Set from SLURM environment variables
     rank = None  # int
     tasks = None  # int
@@ -67,11 +93,36 @@ class KVSController(AbstractController):
         cls._get_env(master_rank=kwargs.pop("master_rank", DEFAULT_MASTER))
 
         # Connect to the host server by calling to KVSClient.__init__
+        cls._connect_args = (args, kwargs)
+        cls._connection_pool = []
         cls.client = KVSClient(*args, **kwargs)
 
     @classmethod
     def shutdown(cls):
-        return cls.client.close()
+        for kvs in cls._connection_pool or []:
+            kvs.close()
+
+        client_off = cls.client.close()
+
+        # Reset the connection state so nothing leaks into a later connection
+        cls.client, cls._connect_args, cls._connection_pool = None, None, None
+        cls.rank, cls.tasks, cls.node, cls.cores, cls.num_nodes, cls.is_master = None, None, None, None, None, False
+        return client_off
+
+    @classmethod
+    def _connections(cls, n):
+        """
+        Get n extra connections to the KVS server, opening more if there aren't enough in the pool yet
+        :param n: int
+        :return: list(KVSClient)
+        """
+        while len(cls._connection_pool) < n:
+            cls._connection_pool.append(KVSClient(*cls._connect_args[0], **cls._connect_args[1]))
+        return cls._connection_pool[:n]
+
+    @classmethod
+    def _bypass_kvs(cls):
+        return cls.single_task_bypass and cls.tasks <= 1
 
     @classmethod
     def _get_env(cls, master_rank=DEFAULT_MASTER):
@@ -80,10 +131,7 @@ class KVSController(AbstractController):
         """
         for k, v in utils.slurm_envs(default.SBATCH_VARS_FOR_KVS).items():
             setattr(cls, k, v)
-        if cls.rank == master_rank:
-            cls.is_master = True
-        else:
-            cls.is_master = False
+        cls.is_master = cls.rank == master_rank
 
     @classmethod
     def own_check(cls, chunk=1, kvs_key='count'):
@@ -92,6 +140,13 @@ class KVSController(AbstractController):
         else:
             return ownCheck(cls.client, 1, chunk=chunk, kvs_key=kvs_key)
 
+    @classmethod
+    def own_ranges(cls, chunk=1, kvs_key='count'):
+        if cls.is_master:
+            return ownRanges(cls.client, 0, chunk=chunk, kvs_key=kvs_key)
+        else:
+            return ownRanges(cls.client, 1, chunk=chunk, kvs_key=kvs_key)
+
     @classmethod
     def master_remove_key(cls, kvs_key='count'):
         if cls.is_master:
@@ -120,26 +175,22 @@ class KVSController(AbstractController):
         :return None:
         """
 
-        wkey = pref + '_wait'
-        ckey = pref + '_continue'
-
-        # Every process puts a wait key up when it gets here
-        cls.put_key(wkey, value)
+        # There's nothing to wait for if this is the only process
+        if cls._bypass_kvs():
+            return None
 
-        # The master pulls down the wait keys until it has all of them
-        # Then it puts up a go key for each process
-
-        if cls.is_master:
-            for _ in range(cls.tasks):
-                c_value = cls.get_key(wkey)
-                if c_value != value:
-                    warnings.warn("Sync warning: master {val_m} is not equal to client {val_c}".format(val_m=value,
-                                                                                                       val_c=c_value))
-            for _ in range(cls.tasks):
-                cls.put_key(ckey, True)
+        # This is a dissemination barrier; in round k every process signals the process 2^k ranks ahead of it
+        # And then waits for the signal from the process 2^k ranks behind it
+        # After ceil(log2(tasks)) rounds every process has (transitively) heard from every other process
 
-        # Every process waits here until go keys are available
-        cls.get_key(ckey)
+        step, k = 1, 0
+        while step < cls.tasks:
+            cls.put_key(_barrier_key(pref, k, (cls.rank + step) % cls.tasks), value)
+            c_value = cls.get_key(_barrier_key(pref, k, cls.rank))
+            if c_value != value:
+                msg = "Sync warning: process {r} value {val_m} is not equal to process {o} value {val_c}"
+                warnings.warn(msg.format(r=cls.rank, val_m=value, o=(cls.rank - step) % cls.tasks, val_c=c_value))
+            step, k = step * 2, k + 1
 
     @classmethod
     def get_key(cls, key):
@@ -162,6 +213,39 @@ class KVSController(AbstractController):
         """
         return cls.client.view(key)
 
+    @classmethod
+    def get_keys(cls, keys, transform=None):
+        """
+        Get a batch of keys concurrently. A KVSClient get blocks until the reply comes back, so the keys are
+        spread round-robin over a pool of persistent connections and each connection is driven by its own thread
+        instead of issuing every get serially on the main client
+        :param keys: list(str)
+            KVS keys to get
+        :param transform: function
+            A function to apply to each value in the worker thread as soon as it arrives (so that file reads overlap
+            with waiting on the other keys). Returns raw values if None
+        :return: list
+            Values in the same order as keys
+        """
+
+        if len(keys) == 0:
+            return []
+
+        n = min(len(keys), MAX_PILEUP_CONNECTIONS)
+        connections = cls._connections(n)
+
+        def _get(i):
+            if transform is None:
+                return [connections[i].get(k) for k in keys[i::n]]
+            else:
+                return [transform(connections[i].get(k)) for k in keys[i::n]]
+
+        values = [None] * len(keys)
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            for i, conn_values in enumerate(executor.map(_get, range(n))):
+                values[i::n] = conn_values
+        return values
+
     @classmethod
     def map(cls, func, *args, **kwargs):
         """
@@ -172,8 +256,8 @@ class KVSController(AbstractController):
         :param args: iterable
             Iterator(s)
         :param tmp_file_path: path
-            If this is not None, instead of putting data onto the KVS, data will be pickled to temp files and the
-            path to the temp file will be put onto the KVS
+            If this is not None, data larger than MAX_KVS_PAYLOAD_SIZE will be pickled to temp files in this path
+            and the path to the temp file will be put onto the KVS instead of the data
         :param tell_children: bool
             If this is True, all processes will end up with the final data after assembly. If false, only the master
             will have the final data; others will return None
@@ -186,85 +270,111 @@ class KVSController(AbstractController):
         assert check.argument_callable(func)
         assert check.argument_list_type(args, collections.Iterable)
 
+        # Skip the KVS entirely if this is the only process
+        if cls._bypass_kvs():
+            return list(map(func, *args))
+
+        # Give the keys for this call a unique suffix so that a process which leaves this call early can't
+        # see the counter or the final data from this call while the master is still cleaning them up
+        call_id, cls._map_calls = cls._map_calls, cls._map_calls + 1
+        count_key, final_key = _call_key(COUNT, call_id), _call_key(FINAL_DATA, call_id)
+
         # Set up the multiprocessing
-        owncheck = cls.own_check(chunk=cls.chunk, kvs_key=COUNT)
-        results = dict()
-        for pos, arg in enumerate(zip(*args)):
-            if next(owncheck):
-                results[pos] = func(*arg)
+        # Claim ranges of positions and skip over anything claimed by another process without checking it
+        # Results are kept as (position of the first result, [results]) for each claimed range
+        results = []
+
+        if all(isinstance(a, collections.abc.Sequence) for a in args):
+            # Index straight into sequences (like the range objects that most maps are called on)
+            n = min(len(a) for a in args)
+            for lower, upper in cls.own_ranges(chunk=cls.chunk, kvs_key=count_key):
+                values = [func(*[a[i] for a in args]) for i in range(lower, min(upper, n))]
+                if len(values) > 0:
+                    results.append((lower, values))
+                if upper >= n:
+                    break
+        else:
+            # Step through anything else, skipping the positions other processes claimed
+            arg_iter = zip(*args)
+            pos = 0
+            for lower, upper in cls.own_ranges(chunk=cls.chunk, kvs_key=count_key):
+                next(itertools.islice(arg_iter, lower - pos, lower - pos), None)
+                values = [func(*arg) for arg in itertools.islice(arg_iter, upper - lower)]
+                if len(values) > 0:
+                    results.append((lower, values))
+                pos = lower + len(values)
+                if pos < upper:
+                    break
 
         # Process results and synchronize exit from the get call
-        results = cls.process_results(results, tmp_file_path=tmp_file_path, tell_children=tell_children)
+        results = cls.process_results(results, tmp_file_path=tmp_file_path, tell_children=tell_children,
+                                      final_data_key=final_key)
         cls.sync_processes(pref=POST_SYNC)
-        cls.master_remove_key(kvs_key=COUNT)
-        cls.master_remove_key(kvs_key=FINAL_DATA)
+        cls.master_remove_key(kvs_key=count_key)
+        if tell_children:
+            cls.master_remove_key(kvs_key=final_key)
         return results
 
     @classmethod
-    def process_results(cls, results, tmp_file_path=None, tell_children=True):
+    def process_results(cls, results, tmp_file_path=None, tell_children=True, final_data_key=FINAL_DATA):
         """
         Pile up results from a get call
-        :param results: dict
-            A dict of results (keyed by position in a final list)
+        :param results: list(tuple(int, list))
+            A list of result chunks, each as the position of its first result in the final list and a list of results
         :param tmp_file_path: path
-            If this is not None, instead of putting data onto the KVS, data will be pickled to temp files and the
-            path to the temp file will be put onto the KVS
+            If this is not None, data larger than MAX_KVS_PAYLOAD_SIZE will be pickled to temp files in this path
+            and the path to the temp file will be put onto the KVS instead of the data
         :param tell_children: bool
             If this is True, all processes will end up with the final data after assembly. If false, only the master
             will have the final data; others will return None
+        :param final_data_key: str
+            The KVS key to send the final data to children with. Nothing is put here if tell_children is False
         :return: list
             A list of function results
         """
 
-        if tmp_file_path is None:
-            # Put the data in KVS
-            cls.put_key(PILEUP_DATA, results)
-        else:
-            # Put the data in a pickled file
-            temp_fd, temp_name = tempfile.mkstemp(prefix="kvs", dir=tmp_file_path)
-            with os.fdopen(temp_fd, "wb") as temp:
-                pickle.dump(results, temp, -1)
-            cls.put_key(PILEUP_DATA, temp_name)
+        # If this is the only process, there's nothing to pile up
+        if cls._bypass_kvs():
+            return _assemble_chunks(results)
 
         if cls.is_master:
-            # If this is the master thread, get all the data and pile it up
-            pileup_results = dict()
-            for _ in range(cls.tasks):
-                if tmp_file_path is None:
-                    pileup_results.update(cls.get_key(PILEUP_DATA))
-                else:
-                    temp_name = cls.get_key(PILEUP_DATA)
-                    with open(temp_name, mode="rb") as temp:
-                        pileup_results.update(pickle.load(temp))
-                    os.remove(temp_name)
-
-            # Put everything into a list based on the dict key
-            pileup_list = [None] * len(pileup_results)
-            for idx, val in pileup_results.items():
-                pileup_list[idx] = val
-
+            # If this is the master thread, get all the data from the other processes and pile it up
+            # Every process has its own pileup key so that they can all be fetched at the same time
+            pileup_chunks = list(results)
+            pileup_keys = [_pileup_key(r) for r in range(cls.tasks) if r != cls.rank]
+            load_payload = None if tmp_file_path is None else functools.partial(_load_payload, remove=True)
+            for pileup_data in cls.get_keys(pileup_keys, transform=load_payload):
+                pileup_chunks.extend(pileup_data)
+
+            # Put everything into a list by slicing each chunk into place
+            pileup_list = _assemble_chunks(pileup_chunks)
+
+            # Keep the payload so the temp file (if there is one) can be removed without asking the KVS for it
+            final_payload = None
             if tell_children and tmp_file_path is None:
                 # Put the piled-up data into KVS
-                cls.put_key(FINAL_DATA, pileup_list)
+                cls.put_key(final_data_key, pileup_list)
             elif tell_children:
-                # Pute the piled-up data into a pickled file
-                temp_fd, temp_name = tempfile.mkstemp(prefix="kvs", dir=tmp_file_path)
-                with os.fdopen(temp_fd, "wb") as temp:
-                    pickle.dump(pileup_list, temp, -1)
-                cls.put_key(FINAL_DATA, temp_name)
-            else:
-                # Put a None onto KVS - only the master needs this data
-                cls.put_key(FINAL_DATA, None)
+                # Put the piled-up data into KVS as pickled bytes or as a pickled file if it's too big
+                final_payload = _dump_payload(pileup_list, tmp_file_path)
+                cls.put_key(final_data_key, final_payload)
 
         else:
+            if tmp_file_path is None:
+                # Put the data in KVS
+                cls.put_key(_pileup_key(cls.rank), results)
+            else:
+                # Put the data in KVS as pickled bytes or as a pickled file if it's too big
+                cls.put_key(_pileup_key(cls.rank), _dump_payload(results, tmp_file_path))
+
             # If this is not the master thread, get the finalized data when the master is finished
+            # Otherwise there's nothing to wait for here; the master is waited on at the next sync
             if tell_children and tmp_file_path is None:
-                pileup_list = cls.view_key(FINAL_DATA)
+                pileup_list = cls.view_key(final_data_key)
             elif tell_children:
-                with open(cls.view_key(FINAL_DATA), "rb") as temp:
-                    pileup_list = pickle.load(temp)
+                pileup_list = _load_payload(cls.view_key(final_data_key))
             else:
-                pileup_list = cls.view_key(FINAL_DATA)
+                pileup_list = None
 
         # Return the piled up data or wait until everyone is done so that the temp file can be deleted
         if tmp_file_path is None:
@@ -272,11 +382,98 @@ class KVSController(AbstractController):
         else:
             cls.sync_processes(pref=TMP_FILE_SYNC)
             if cls.is_master:
-                os.remove(cls.view_key(FINAL_DATA))
+                _remove_payload(final_payload)
             return pileup_list
 
 
-def ownCheck(kvs, rank, chunk=1, kvs_key='count'):
+def _assemble_chunks(chunks):
+    """
+    Build a list of results from (position of the first result, [results]) chunks
+    :param chunks: list(tuple(int, list))
+    :return: list
+    """
+    results = [None] * sum(len(values) for _, values in chunks)
+    for start, values in chunks:
+        results[start:start + len(values)] = values
+    return results
+
+
+def _dump_payload(data, tmp_file_path):
+    """
+    Pickle data for the KVS. Small objects are returned as pickled bytes; anything larger than MAX_KVS_PAYLOAD_SIZE
+    is written to a temp file in tmp_file_path and the file name is returned instead
+    :param data: Anything you can pickle
+    :param tmp_file_path: path
+    :return: bytes / str
+    """
+    payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    if len(payload) <= MAX_KVS_PAYLOAD_SIZE:
+        return payload
+
+    temp_fd, temp_name = tempfile.mkstemp(prefix="kvs", dir=tmp_file_path)
+    with os.fdopen(temp_fd, "wb") as temp:
+        temp.write(payload)
+    return temp_name
+
+
+def _load_payload(payload, remove=False):
+    """
+    Unpickle data created by _dump_payload
+    :param payload: bytes / str
+        Pickled bytes or the name of a pickled file
+    :param remove: bool
+        Delete the file after reading it (if the payload is a file)
+    :return: Unpickled data
+    """
+    if isinstance(payload, bytes):
+        return pickle.loads(payload)
+
+    with open(payload, mode="rb") as temp:
+        data = pickle.load(temp)
+    if remove:
+        os.remove(payload)
+    return data
+
+
+def _remove_payload(payload):
+    # Delete the file backing a payload (if there is one)
+    if payload is not None and not isinstance(payload, bytes):
+        os.remove(payload)
+
+
+def _barrier_key(pref, barrier_round, rank):
+    return "{p}_barrier_{k}_{r}".format(p=pref, k=barrier_round, r=rank)
+
+
+def _call_key(kvs_key, call_id):
+    return "{k}_{i}".format(k=kvs_key, i=call_id)
+
+
+def _pileup_key(rank):
+    return PILEUP_DATA + "_" + str(rank)
+
+
+def fetch_and_add(kvs, kvs_key, increment):
+    """
+    Increment a counter on the KVS and return the value it had before the increment.
+    KVS gets are consuming, so every other process blocks on the key until the new value is put back; this makes the
+    read-modify-write atomic without any server-side support
+    :param kvs: KVSClient
+        KVS object for server access
+    :param kvs_key: str
+        The KVS key holding the counter
+    :param increment: int
+        The amount to add to the counter
+    :return: int
+        The counter value before incrementing
+    """
+    value = kvs.get(kvs_key)
+    kvs.put(kvs_key, value + increment)
+    return value
+
+
+def ownRanges(kvs, rank, chunk=1, kvs_key='count', max_chunk=None):
     """
     Generator
     :param kvs: KVSClient
@@ -285,27 +482,55 @@ def ownCheck(kvs, rank, chunk=1, kvs_key='count'):
         The size of the chunk given to each subprocess
     :param kvs_key: str
         The KVS key to increment (default is 'count')
-    :yield: bool
-        True if this process has dibs on whatever. False if some other process has claimed it first.
+    :param max_chunk: int
+        The chunk size is doubled (up to max_chunk) whenever another process has claimed a chunk since this process
+        last claimed one, which cuts the number of claims when many processes are competing for the counter.
+        Defaults to chunk * MAX_CHUNK_GROWTH
+    :yield: int, int
+        The lower (inclusive) and upper (exclusive) bounds of a range of positions that this process has dibs on.
+        Ranges are claimed in increasing order.
     """
     if rank == 0:
         kvs.put(kvs_key, 0)
 
-    # Start at the baseline
-    checks, lower, upper = 0, -1, -1
+    max_chunk = chunk * MAX_CHUNK_GROWTH if max_chunk is None else max(chunk, max_chunk)
+    upper = -1
 
     while True:
 
-        # Checks increments every loop
-        # If it's greater than the upper bound, get a new lower bound from the KVS count
-        # Set the new upper bound by adding chunk to lower
-        # And then put the new upper bound back into KVS key
+        # Claim the next chunk from the KVS count
+        # If someone else claimed a chunk since our last claim, the counter is contended and the chunk grows
+        lower = fetch_and_add(kvs, kvs_key, chunk)
+        contended = upper >= 0 and lower != upper
+        upper = lower + chunk
+        if contended:
+            chunk = min(chunk * 2, max_chunk)
+
+        yield lower, upper
+
+
+def ownCheck(kvs, rank, chunk=1, kvs_key='count', max_chunk=None):
+    """
+    Generator
+    :param kvs: KVSClient
+        KVS object for server access
+    :param chunk: int
+        The size of the chunk given to each subprocess
+    :param kvs_key: str
+        The KVS key to increment (default is 'count')
+    :param max_chunk: int
+        The maximum chunk size (see ownRanges)
+    :yield: bool
+        True if this process has dibs on whatever. False if some other process has claimed it first.
+    """
+
+    # Start at the baseline
+    checks = 0
 
-        if checks >= upper:
-            lower = kvs.get(kvs_key)
-            upper = lower + chunk
-            kvs.put(kvs_key, upper)
+    for lower, upper in ownRanges(kvs, rank, chunk=chunk, kvs_key=kvs_key, max_chunk=max_chunk):
 
         # Yield TRUE if this row belongs to this process and FALSE if it doesn't
-        yield lower <= checks < upper
-        checks += 1
+        # Claim a new range once checks passes the upper bound of this one
+        while checks < upper:
+            yield checks >= lower
+            checks += 1
@@ -1,9 +1,10 @@
 """
 MultiprocessingController runs everything through a multiprocessing Pool
-This requires pathos because the default multiprocessing serializes with cPickle
+This requires pathos (for multiprocess and dill) because the default multiprocessing serializes with cPickle
 """
 
-import pathos
+import dill
+import multiprocess
 import collections
 
 from inferelator.distributed import AbstractController
@@ -21,9 +22,30 @@ class MultiprocessingController(AbstractController):
     # Num processes
     processes = 4
 
+    # Seconds to wait for every worker to pick up a mapped function
+    broadcast_timeout = 300
+
+    # Barrier that the pool workers wait on when a mapped function is broadcast
+    _broadcast_barrier = None
+
     @classmethod
     def connect(cls, *args, **kwargs):
-        cls.client = pathos.multiprocessing.ProcessPool(nodes=cls.processes, **kwargs)
+        """
+        Start the worker pool. It is kept until shutdown and reused by every map call
+
+        :param kwargs: Passed to multiprocess.Pool. An initializer is run (with initargs) in each worker when it
+            starts. maxtasksperchild is not supported, because a replacement worker would not have the function
+            that is being mapped
+        """
+
+        if kwargs.get("maxtasksperchild") is not None:
+            raise ValueError("The multiprocessing controller does not support maxtasksperchild")
+
+        initializer, initargs = kwargs.pop("initializer", None), kwargs.pop("initargs", ())
+
+        cls._broadcast_barrier = multiprocess.Barrier(cls.processes)
+        cls.client = multiprocess.Pool(cls.processes, initializer=_start_worker,
+                                       initargs=(cls._broadcast_barrier, initializer, initargs), **kwargs)
         return True
 
     @classmethod
@@ -53,8 +75,53 @@ class MultiprocessingController(AbstractController):
         """
         assert check.argument_callable(func)
         assert check.argument_list_type(args, collections.Iterable)
-        return cls.client.map(func, *args, chunksize=cls.chunk)
+
+        # Hand the function to each worker once instead of serializing the function and everything in its closure
+        # into every chunk of tasks, and drop it from the workers when the map is done
+        cls._broadcast(dill.dumps(func))
+
+        try:
+            return cls.client.starmap(_call_map_function, zip(*args), chunksize=cls.chunk)
+        finally:
+            cls._broadcast(None)
+
+    @classmethod
+    def _broadcast(cls, payload):
+        # Each worker blocks on a barrier after taking one of these tasks, so every worker gets exactly one
+        n = cls._broadcast_barrier.parties
+
+        try:
+            cls.client.starmap(_set_map_function, [(payload, cls.broadcast_timeout)] * n, chunksize=1)
+        except Exception:
+            cls._broadcast_barrier.reset()
+            raise
 
     @classmethod
     def shutdown(cls):
-        return cls.client.close()
+        cls.client.close()
+        cls.client.join()
+        cls.client, cls._broadcast_barrier = None, None
+        return True
+
+
+# The function being mapped in this worker process, and the barrier that workers wait on when it's set
+_map_function = None
+_broadcast_barrier = None
+
+
+def _start_worker(barrier, initializer, initargs):
+    global _broadcast_barrier
+    _broadcast_barrier = barrier
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _set_map_function(payload, timeout):
+    global _map_function
+    _map_function = dill.loads(payload) if payload is not None else None
+    _broadcast_barrier.wait(timeout)
+
+
+def _call_map_function(*args):
+    return _map_function(*args)
@@ -49,7 +49,6 @@ class RankSummaryF1(RankSummaryPR):
     def output_curve(self, ax=None, figsize=(6, 4)):
         if ax is None:
             fig, ax = plt.subplots(figsize=figsize, constrained_layout=True)
-            ax = fig.add_subplot(1, 1, 1)
 
         # Extract the recall and precision data
         curve = self.curve_dataframe()
@@ -96,6 +96,10 @@ class InferelatorResults(object):
         :param curve_data_file_name:
         :return:
         """
+        # Nothing is written without an output directory, so skip drawing the curve
+        if output_dir is None:
+            return
+
         nm = self.new_metric(metric_object, curve_file_name=curve_file_name, curve_data_file_name=curve_data_file_name)
         nm.metric.output_curve_pdf(output_dir, curve_file_name) if curve_file_name is not None else None
         self.write_to_tsv(nm.curve, output_dir, curve_data_file_name) if curve_data_file_name is not None else None
@@ -109,6 +113,10 @@ class InferelatorResults(object):
         :type output_dir: str, None
         """
 
+        # Nothing is written without an output directory, so skip drawing the curve and everything else
+        if output_dir is None:
+            return
+
         # Validate that the output path exists (create it if necessary)
         check.argument_path(output_dir, allow_none=True, create_if_needed=True)
 
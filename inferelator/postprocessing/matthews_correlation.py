@@ -58,7 +58,6 @@ class RankSummaryMCC(RankSummingMetric):
 
         if ax is None:
             fig, ax = plt.subplots(figsize=figsize, constrained_layout=True)
-            ax = fig.add_subplot(1, 1, 1)
 
         # Extract the recall and precision data
         curve = self.curve_dataframe()
@@ -86,9 +86,14 @@ class CombinedMetric(RankSummaryF1, RankSummaryPR, RankSummaryMCC):
 
         file_name = self.curve_file_name if file_name is None else file_name
 
-        # Create a figure
+        # Create a figure (without pyplot if it's only going to be written to a file)
+        to_file = file_name is not None and output_dir is not None
         with plt.style.context(style_label):
-            fig, axes = plt.subplots(nrows=2, ncols=2, figsize=figsize, constrained_layout=True)
+            if to_file:
+                fig = self.file_figure(figsize=figsize)
+                axes = fig.subplots(nrows=2, ncols=2)
+            else:
+                fig, axes = plt.subplots(nrows=2, ncols=2, figsize=figsize, constrained_layout=True)
 
             # Draw the PR curve
             RankSummaryPR.output_curve(self, ax=axes[0, 0])
@@ -108,10 +113,8 @@ class CombinedMetric(RankSummaryF1, RankSummaryPR, RankSummaryMCC):
             self.output_histogram_edges_conf(self.filtered_data[CONFIDENCE_COLUMN].values, ax=axes[1, 1])
 
         # If there's a file name set, make the output file
-        if file_name is not None and output_dir is not None:
-            # Save the plot and close
+        if to_file:
             self.save_figure(os.path.join(output_dir, file_name), fig, dpi=dpi)
-            plt.close(fig)
             return None, None
 
         return fig, axes
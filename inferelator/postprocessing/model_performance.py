@@ -2,6 +2,9 @@ import os
 import pandas as pd
 import numpy as np
 import gzip
+import numba
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from inferelator import utils
 from inferelator.utils import Validator as check
 from inferelator.postprocessing import (GOLD_STANDARD_COLUMN, CONFIDENCE_COLUMN, TARGET_COLUMN, REGULATOR_COLUMN,
@@ -98,20 +101,38 @@ class RankSummingMetric(object):
 
         file_name = self.curve_file_name if file_name is None else file_name
 
-        # Plot the curve
-        ax = self.output_curve(figsize=figsize)
-        fig = ax.get_figure()
-
-        # If there's a file name set, make the output file
+        # If there's a file name set, draw the curve without pyplot and make the output file
         if file_name is not None and output_dir is not None:
-            # Save the plot and close
+            fig = self.file_figure(figsize=figsize)
+            ax = self.output_curve(ax=fig.add_subplot(1, 1, 1))
             self.save_figure(os.path.join(output_dir, file_name), fig, dpi=dpi)
 
+        # Otherwise plot the curve with pyplot so it can be displayed
+        else:
+            ax = self.output_curve(figsize=figsize)
+            fig = ax.get_figure()
+
         return fig, ax
 
     def output_curve(self, ax=None, figsize=(6, 4)):
         raise NotImplementedError
 
+    @staticmethod
+    def file_figure(figsize=(6, 4)):
+        """
+        Create a figure attached directly to an Agg canvas. Figures that are only written to a file don't need to be
+        registered with pyplot, so they skip the pyplot state machine and interactive backends, and nothing has to
+        be closed afterwards
+
+        :param figsize: Figure size
+        :type figsize: tuple
+        :return: Figure object
+        :rtype: matplotlib.figure.Figure
+        """
+        fig = Figure(figsize=figsize, constrained_layout=True)
+        FigureCanvasAgg(fig)
+        return fig
+
     @staticmethod
     def save_figure(file_name, fig, dpi=300):
         """
@@ -154,21 +175,24 @@ class RankSummingMetric(object):
         :param rankable_data: list(pd.DataFrame [M x N])
         :return combine_conf: pd.DataFrame [M x N]
         """
-        # Create an 0s dataframe shaped to the data to be ranked
-        combine_conf = pd.DataFrame(np.zeros(rankable_data[0].shape),
-                                    index=rankable_data[0].index,
-                                    columns=rankable_data[0].columns)
-
-        for replicate in rankable_data:
-            # Flatten and rank based on the beta error reductions
-            ranked_replicate = np.reshape(pd.DataFrame(replicate.values.flatten()).rank().values, replicate.shape)
-            # Sum the rankings for each bootstrap
-            combine_conf += ranked_replicate
+        # Flatten and rank based on the beta error reductions, and sum the rankings for each bootstrap
+        # A single replicate only needs to be ranked, so skip stacking and summing
+        if len(rankable_data) == 1:
+            values = _rankable(rankable_data[0].values)
+            combine_conf = np.empty(values.shape, dtype=np.float64)
+            _rank_row(values, combine_conf)
+            combine_conf = combine_conf.reshape(rankable_data[0].shape)
+
+        # Replicates are ranked in parallel and then summed
+        else:
+            combine_conf = _rank_stack(np.stack([_rankable(replicate.values) for replicate in rankable_data]))
+            combine_conf = combine_conf.sum(axis=0).reshape(rankable_data[0].shape)
 
         # Convert rankings to confidence values
-        min_element = min(combine_conf.values.flatten())
-        combine_conf = (combine_conf - min_element) / (len(rankable_data) * combine_conf.size - min_element)
-        return combine_conf
+        min_element = np.nanmin(combine_conf)
+        combine_conf -= min_element
+        combine_conf /= len(rankable_data) * combine_conf.size - min_element
+        return pd.DataFrame(combine_conf, index=rankable_data[0].index, columns=rankable_data[0].columns)
 
     @staticmethod
     def compute_confusion_matrix(data, rank_col=CONFIDENCE_COLUMN, gs_col=GOLD_STANDARD_COLUMN):
@@ -227,3 +251,77 @@ class RankSummingMetric(object):
     def transform_column(df, group_col, xform_col, xform):
         # Transform column based on a grouping column
         df[xform_col] = df[[group_col, xform_col]].groupby(group_col)[xform_col].transform(xform)
+
+
+def _rankable(values):
+    """
+    Flatten values for ranking
+    :param values: np.ndarray
+    :return: np.ndarray [N]
+    """
+    # Rank numeric values in their own precision; ranking only needs their order, so there's no reason to make a
+    # float64 copy of (for example) float32 betas first
+    values = np.asarray(values).ravel()
+    return values if values.dtype.kind in "biuf" else values.astype(np.float64)
+
+
+@numba.jit(nopython=True, parallel=True, cache=True)
+def _rank_stack(arr):
+    """
+    Rank each row (averaging ties) the same way as pd.Series.rank, leaving missing values missing
+    :param arr: np.ndarray [K x N]
+    :return: np.ndarray [K x N]
+    """
+    ranks = np.empty(arr.shape, dtype=np.float64)
+
+    for k in numba.prange(arr.shape[0]):
+        _rank_row(arr[k], ranks[k])
+
+    return ranks
+
+
+@numba.jit(nopython=True, cache=True)
+def _rank_row(row, ranks):
+    """
+    Rank one row (averaging ties) into ranks
+    :param row: np.ndarray [N]
+    :param ranks: np.ndarray [N]
+    """
+    n = row.shape[0]
+
+    # Betas are mostly zeros, which all tie; only sort the nonzero values and slot the zeros in between the
+    # negative and the positive values
+    nonzero = np.empty(n, dtype=np.int64)
+    m, n_neg, n_zero = 0, 0, 0
+    for i in range(n):
+        v = row[i]
+        if v != v:
+            ranks[i] = np.nan
+        elif v == 0:
+            n_zero += 1
+        else:
+            n_neg += v < 0
+            nonzero[m] = i
+            m += 1
+
+    zero_rank = n_neg + (n_zero + 1) / 2.
+    for i in range(n):
+        if row[i] == 0:
+            ranks[i] = zero_rank
+
+    nonzero = nonzero[:m]
+    order = nonzero[np.argsort(row[nonzero])]
+
+    # Walk the sorted values and give each run of ties the mean of its positions
+    i = 0
+    while i < m:
+        v = row[order[i]]
+        j = i + 1
+        while j < m and row[order[j]] == v:
+            j += 1
+
+        # Positive values are ranked after all of the zeros
+        tie_rank = (i + j + 1) / 2. + (n_zero if v > 0 else 0)
+        for t in range(i, j):
+            ranks[order[t]] = tie_rank
+        i = j
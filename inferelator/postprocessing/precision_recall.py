@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 import os
+import numba
 
 from inferelator import utils
 from inferelator.utils import Validator as check
@@ -19,10 +20,15 @@ class RankSummaryPR(RankSummingMetric):
     name = "AUPR"
     curve_file_name = "pr_curve.pdf"
 
+    _aupr = None
+
     # PR
     @property
     def aupr(self):
-        return self.calculate_aupr(self.filtered_data)
+        # score(), auc() and the curve plots all ask for the AUPR, so only integrate the curve once
+        if self._aupr is None:
+            self._aupr = self.calculate_aupr(self.filtered_data)
+        return self._aupr
 
     def __init__(self, rankable_data, gold_standard, filter_method='keep_all_gold_standard'):
 
@@ -51,7 +57,6 @@ class RankSummaryPR(RankSummingMetric):
     def output_curve(self, ax=None, figsize=(6, 4)):
         if ax is None:
             fig, ax = plt.subplots(figsize=figsize, constrained_layout=True)
-            ax = fig.add_subplot(1, 1, 1)
 
         # Extract the recall and precision data
         recall, precision = self.modify_pr(self.curve_dataframe())
@@ -116,18 +121,17 @@ class RankSummaryPR(RankSummingMetric):
         valid_gs_idx = ~pd.isnull(data[GOLD_STANDARD_COLUMN])
 
         # Find the edges that are in the gold standard
-        valid_gs = (data.loc[valid_gs_idx, GOLD_STANDARD_COLUMN] != 0).astype(int)
+        valid_gs = (data.loc[valid_gs_idx, GOLD_STANDARD_COLUMN].values != 0).astype(np.int8)
 
         # the following mimics the R function ChristophsPR
         # Add nan columns
         data[PRECISION_COLUMN] = np.nan
         data[RECALL_COLUMN] = np.nan
 
-        # Calculate precision [TP / (TP + FP)]
-        data.loc[valid_gs_idx, PRECISION_COLUMN] = np.cumsum(valid_gs).astype(float) / np.arange(1, len(valid_gs)+1, 1)
-
-        # Calculate recall [TP / (TP + FN)]
-        data.loc[valid_gs_idx, RECALL_COLUMN] = np.cumsum(valid_gs).astype(float) / sum(valid_gs)
+        # Calculate precision [TP / (TP + FP)] and recall [TP / (TP + FN)]
+        precision, recall = _precision_recall(valid_gs)
+        data.loc[valid_gs_idx, PRECISION_COLUMN] = precision
+        data.loc[valid_gs_idx, RECALL_COLUMN] = recall
 
         if transform_ties is not None:
             RankSummingMetric.transform_column(data, CONFIDENCE_COLUMN, PRECISION_COLUMN, transform_ties)
@@ -164,6 +168,31 @@ class RankSummaryPR(RankSummingMetric):
     def calculate_aupr(data):
         recall, precision = RankSummaryPR.modify_pr(data)
         # using midpoint integration to calculate the area under the curve
-        d_recall = np.diff(recall)
-        m_precision = precision[:-1] + np.diff(precision) / 2
-        return sum(d_recall * m_precision)
+        # sum((r[i+1] - r[i]) * (p[i+1] + p[i]) / 2), as a single dot product
+        return 0.5 * np.dot(np.diff(recall), precision[1:] + precision[:-1])
+
+
+@numba.jit(nopython=True, error_model='numpy', cache=True)
+def _precision_recall(gs):
+    """
+    Calculate precision and recall in one pass over gold standard flags that are sorted by descending confidence
+    :param gs: np.ndarray [N]
+        1 if the edge is in the gold standard, 0 otherwise
+    :return precision: np.ndarray [N]
+    :return recall: np.ndarray [N]
+    """
+    n = gs.shape[0]
+    precision = np.empty(n, dtype=np.float64)
+    recall = np.empty(n, dtype=np.float64)
+
+    total = 0.
+    for i in range(n):
+        total += gs[i]
+
+    tp = 0.
+    for i in range(n):
+        tp += gs[i]
+        precision[i] = tp / (i + 1)
+        recall[i] = tp / total
+
+    return precision, recall
@@ -190,15 +190,19 @@ class ResultsProcessor(object):
 
         assert check.dataframes_align(betas)
 
-        betas_sign = pd.DataFrame(np.zeros(betas[0].shape), index=betas[0].index, columns=betas[0].columns)
-        betas_non_zero = pd.DataFrame(np.zeros(betas[0].shape), index=betas[0].index, columns=betas[0].columns)
+        # Accumulate integer counts into arrays (instead of adding dataframes) and only wrap them up at the end
+        betas_sign = np.zeros(betas[0].shape, dtype=np.int32)
+        betas_non_zero = np.zeros(betas[0].shape, dtype=np.int32)
         for beta in betas:
-            # Convert betas to -1,0,1 based on signing and then sum the results for each bootstrap
-            betas_sign = betas_sign + np.sign(beta.values)
+            beta = beta.values
+            # Count positive betas as +1 and negative betas as -1 and sum the results for each bootstrap
+            betas_sign += beta > 0
+            betas_sign -= beta < 0
             # Tally all non-zeros for each bootstrap
-            betas_non_zero = betas_non_zero + (beta != 0).astype(int)
+            betas_non_zero += beta != 0
 
-        return betas_sign, betas_non_zero
+        return (pd.DataFrame(betas_sign.astype(np.float64), index=betas[0].index, columns=betas[0].columns),
+                pd.DataFrame(betas_non_zero.astype(np.float64), index=betas[0].index, columns=betas[0].columns))
 
     @staticmethod
     def passes_threshold(betas_non_zero, max_num, threshold):
@@ -219,7 +223,8 @@ class ResultsProcessor(object):
         assert check.argument_integer(max_num)
         assert check.argument_numeric(threshold, low=0, high=1)
 
-        return ((betas_non_zero / max_num) >= threshold).astype(int)
+        return pd.DataFrame(((betas_non_zero.values / max_num) >= threshold).astype(int),
+                            index=betas_non_zero.index, columns=betas_non_zero.columns)
 
     @staticmethod
     def mean_and_median(stack):
@@ -236,7 +241,10 @@ class ResultsProcessor(object):
 
         assert check.dataframes_align(stack)
 
-        matrix_stack = [x.values for x in stack]
+        # Stack once (np.mean and np.median would each build their own array from a list)
+        # The stack is a private copy, so the median can partition it in place
+        matrix_stack = np.stack([x.values for x in stack])
         mean_data = pd.DataFrame(np.mean(matrix_stack, axis=0), index=stack[0].index, columns=stack[0].columns)
-        median_data = pd.DataFrame(np.median(matrix_stack, axis=0), index=stack[0].index, columns=stack[0].columns)
+        median_data = pd.DataFrame(np.median(matrix_stack, axis=0, overwrite_input=True),
+                                   index=stack[0].index, columns=stack[0].columns)
         return mean_data, median_data
@@ -1,5 +1,5 @@
 import numpy as np
-from scipy import linalg, sparse
+from scipy import linalg
 from inferelator import utils
 
 
@@ -18,17 +18,16 @@ class TFA:
         :return: InferelatorData [N x K]
         """
 
-        prior, activity_tfs, expr_tfs = self._check_prior(prior, expression_data, keep_self=keep_self)
+        prior, a_cols, e_cols = self._check_prior_masks(prior, expression_data, keep_self=keep_self)
 
         activity = np.zeros((expression_data.shape[0], prior.shape[1]), dtype=np.float64)
 
-        if len(activity_tfs) > 0:
-            a_cols = prior.columns.isin(activity_tfs)
+        if a_cols.any():
             expr = expression_data_halftau if expression_data_halftau is not None else expression_data
-            activity[:, a_cols] = self._calculate_activity(prior.loc[:, activity_tfs].values, expr)
+            activity[:, a_cols] = self._calculate_activity(prior.values[:, a_cols], expr)
 
-        if len(expr_tfs) > 0:
-            activity[:, prior.columns.isin(expr_tfs)] = expression_data.get_gene_data(expr_tfs, force_dense=True)
+        if e_cols.any():
+            activity[:, e_cols] = expression_data.get_gene_data(prior.columns[e_cols], force_dense=True)
 
         data_name = "Activity" if expression_data.name is None else "{n} Activity".format(n=expression_data.name)
         return utils.InferelatorData(activity,
@@ -38,37 +37,96 @@ class TFA:
                                      name=data_name)
 
     def _check_prior(self, prior, expression_data, keep_self=False):
+
+        prior, activity_tfs, expr_tfs = self._check_prior_masks(prior, expression_data, keep_self=keep_self)
+        return prior, prior.columns[activity_tfs], prior.columns[expr_tfs]
+
+    def _check_prior_masks(self, prior, expression_data, keep_self=False):
+        """
+        Remove TFs which have neither prior edges nor expression from the prior, and return boolean masks for
+        the TFs which remain so that the prior is only scanned once
+
+        :param prior: pd.DataFrame [G x K]
+        :param expression_data: InferelatorData [N x G]
+        :param keep_self: bool
+        :return prior: pd.DataFrame [G x K']
+        :return activity_tfs: np.ndarray [K'] bool
+            TFs which have prior edges and can have activity calculated
+        :return expr_tfs: np.ndarray [K'] bool
+            TFs which have no prior edges but do have expression
+        """
         if not keep_self:
             prior = utils.df_set_diag(prior, 0)
 
-        activity_tfs, expr_tfs, drop_tfs = self._determine_tf_status(prior, expression_data)
+        activity_tfs, expr_tfs = self._tf_status_masks(prior, expression_data)
+        keep_tfs = activity_tfs | expr_tfs
 
-        if len(drop_tfs) > 0:
+        if not keep_tfs.all():
+            drop_tfs = prior.columns[~keep_tfs]
             msg = "{n} TFs are removed from activity (no expression or prior exists)".format(n=len(drop_tfs))
             utils.Debug.vprint(msg, level=0)
             utils.Debug.vprint(" ".join(drop_tfs), level=1)
 
-        prior = prior.drop(drop_tfs, axis=1)
+            prior = prior.iloc[:, keep_tfs]
+            activity_tfs, expr_tfs = activity_tfs[keep_tfs], expr_tfs[keep_tfs]
 
         return prior, activity_tfs, expr_tfs
 
     @staticmethod
     def _determine_tf_status(prior, expression_data):
 
+        activity_tfs, expr_tfs = TFA._tf_status_masks(prior, expression_data)
+        return prior.columns[activity_tfs], prior.columns[expr_tfs], prior.columns[~(activity_tfs | expr_tfs)]
+
+    @staticmethod
+    def _tf_status_masks(prior, expression_data):
+
         # These TFs can have activity calculations performed for them because there are priors
-        activity_tfs = ((prior != 0).sum(axis=0) != 0).values
+        activity_tfs = (prior.values != 0).any(axis=0)
         # These TFs match gene expression only (no activity calculation)
         expr_tfs = prior.columns.isin(expression_data.gene_names)
         expr_tfs &= ~activity_tfs
 
-        return prior.columns[activity_tfs], prior.columns[expr_tfs], prior.columns[~(activity_tfs | expr_tfs)]
+        return activity_tfs, expr_tfs
 
     @staticmethod
     def _calculate_activity(prior, expression_data):
 
         prior_dtype = np.float32 if expression_data.values.dtype == np.float32 else np.float64
-        return utils.DotProduct.dot(expression_data.values, sparse.csr_matrix(linalg.pinv(prior).T, dtype=prior_dtype),
-                                    dense=True, cast=True)
+        u, s_inv, vt = TFA._pinv_factors(prior, dtype=prior_dtype)
+
+        # Activity [N x K] is X [N x G] * pinv(P).T [G x K], which is ((X * U) / s) * V.T
+        # Multiplying through the factors keeps the inner dimension at rank(P) and never builds the pseudoinverse
+        activity = utils.DotProduct.dot(expression_data.values, u, dense=True, cast=True)
+        activity *= s_inv
+        return np.dot(activity, vt)
+
+    @staticmethod
+    def _pinv_factors(prior, dtype=np.float64):
+        """
+        Calculate the factors of the pseudoinverse of the prior from a single thin SVD.
+        Singular values below max(G, K) * eps * the largest singular value are treated as zero.
+
+        :param prior: np.ndarray [G x K]
+        :param dtype: Float dtype to do the decomposition in. Single precision is used for single precision
+            expression data
+        :return u: np.ndarray [G x R]
+        :return s_inv: np.ndarray [R]
+            The reciprocal of the retained singular values
+        :return vt: np.ndarray [R x K]
+        """
+
+        prior = np.asarray(prior, dtype=dtype, order="C")
+
+        # Priors are mostly genes with no edges at all; those rows contribute nothing to the decomposition
+        # Decompose only the genes with edges and put zero rows back into U afterwards
+        edge_genes = (prior != 0).any(axis=1)
+        u, s, vt = linalg.svd(prior[edge_genes, :], full_matrices=False)
+        keep = s > (max(prior.shape) * np.finfo(s.dtype).eps * s[0]) if s.size > 0 else s > 0
+
+        u_full = np.zeros((prior.shape[0], np.sum(keep)), dtype=u.dtype)
+        u_full[edge_genes, :] = u[:, keep]
+        return u_full, 1. / s[keep], vt[keep, :]
 
 
 class NoTFA(TFA):
@@ -101,3 +101,16 @@ class TestExpressionLoader(unittest.TestCase):
         loader._safe_dataframe_decoder(df3)
 
         pdt.assert_frame_equal(df3, df3_c)
+
+    def test_tsv_python_engine_settings(self):
+        data = pd.DataFrame([[1, 2], [3, 4]], index=['x', 'y'], columns=['a', 'b'])
+
+        with tempfile.TemporaryDirectory() as txdir:
+            with open(os.path.join(txdir, "data.tsv"), "w") as fh:
+                data.to_csv(fh, sep="\t")
+                fh.write("footer line\n")
+
+            # skipfooter is only supported by the python engine
+            loaded = loader.InferelatorDataLoader(txdir).input_dataframe("data.tsv", skipfooter=1)
+
+        pdt.assert_frame_equal(data, loaded)
@@ -0,0 +1,430 @@
+import unittest
+import unittest.mock
+import collections
+import threading
+import tempfile
+import warnings
+import random
+import time
+import os
+
+# Run tests only when the associated packages are installed
+try:
+    from inferelator.distributed import kvs_controller
+
+    TEST_KVS = True
+except ImportError:
+    TEST_KVS = False
+
+
+class StubKVSStore(object):
+    """
+    In-memory stand-in for a KVS server. Values are queued per key like they are on the server
+    """
+
+    def __init__(self):
+        self.values = collections.defaultdict(collections.deque)
+        self.condition = threading.Condition()
+
+
+class StubKVS(object):
+    """
+    In-memory stand-in for a KVSClient. Clients made on the same store share keys like clients connected to the same
+    server; get and view block until a key has a value, get consumes it and view doesn't
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        with self.store.condition:
+            self.store.condition.wait_for(lambda: len(self.store.values[key]) > 0)
+            return self.store.values[key].popleft()
+
+    def view(self, key):
+        with self.store.condition:
+            self.store.condition.wait_for(lambda: len(self.store.values[key]) > 0)
+            return self.store.values[key][0]
+
+    def put(self, key, value):
+        with self.store.condition:
+            self.store.values[key].append(value)
+            self.store.condition.notify_all()
+
+    def close(self):
+        pass
+
+
+def math_function(x, y):
+    return x * 10 + y
+
+
+@unittest.skipIf(not TEST_KVS, "KVS not installed")
+class TestKVSStub(unittest.TestCase):
+    timeout = 30
+
+    def setUp(self):
+        self.store = StubKVSStore()
+
+        # Connections opened for concurrent gets go to the stub store instead of a server
+        patcher = unittest.mock.patch.object(kvs_controller, "KVSClient", StubKVS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rank_controllers(self, tasks, **kwargs):
+        # One controller class per simulated process, each with its own client connected to the stub store
+        return [type("KVSRank{r}".format(r=r), (kvs_controller.KVSController,),
+                     dict(client=StubKVS(self.store), rank=r, tasks=tasks, is_master=r == 0,
+                          _connect_args=((self.store,), {}), _connection_pool=[], **kwargs))
+                for r in range(tasks)]
+
+    def run_ranks(self, controllers, func):
+        # Run func(controller) for every simulated process in its own thread and return the results by rank
+        results, errors = [None] * len(controllers), []
+
+        def _run(r):
+            try:
+                results[r] = func(controllers[r])
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=_run, args=(r,), daemon=True) for r in range(len(controllers))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(self.timeout)
+
+        self.assertFalse(any(t.is_alive() for t in threads), "Simulated processes did not finish")
+        if len(errors) > 0:
+            raise errors[0]
+        return results
+
+    def assertStoreEmpty(self):
+        self.assertDictEqual({k: list(v) for k, v in self.store.values.items() if len(v) > 0}, {})
+
+
+class TestKVSMap(TestKVSStub):
+    map_test_data = [list(range(100)), list(range(100, 200))]
+    map_test_expect = [math_function(x, y) for x, y in zip(*map_test_data)]
+
+    def test_map_single_task_bypass(self):
+        controller = type("KVSSingle", (kvs_controller.KVSController,), dict(client=None, rank=0, tasks=1,
+                                                                             is_master=True))
+        self.assertListEqual(controller.map(math_function, *self.map_test_data), self.map_test_expect)
+        self.assertEqual(controller._map_calls, kvs_controller.KVSController._map_calls)
+
+    def test_map_single_task_through_kvs(self):
+        [controller] = self.rank_controllers(1, single_task_bypass=False, chunk=7)
+        self.assertListEqual(controller.map(math_function, *self.map_test_data), self.map_test_expect)
+        self.assertIsNone(controller.sync_processes())
+        self.assertEqual(controller._map_calls, kvs_controller.KVSController._map_calls + 1)
+        self.assertStoreEmpty()
+
+    def test_map_tell_children(self):
+        results = self.run_ranks(self.rank_controllers(3, chunk=3),
+                                 lambda c: c.map(math_function, *self.map_test_data, tell_children=True))
+
+        for r in results:
+            self.assertListEqual(r, self.map_test_expect)
+        self.assertStoreEmpty()
+
+    def test_map_dont_tell_children(self):
+        results = self.run_ranks(self.rank_controllers(3, chunk=3),
+                                 lambda c: c.map(math_function, *self.map_test_data, tell_children=False))
+
+        self.assertListEqual(results[0], self.map_test_expect)
+        self.assertListEqual(results[1:], [None, None])
+        self.assertStoreEmpty()
+
+    def test_map_iterators(self):
+        results = self.run_ranks(self.rank_controllers(3, chunk=3),
+                                 lambda c: c.map(math_function, *[iter(a) for a in self.map_test_data]))
+
+        for r in results:
+            self.assertListEqual(r, self.map_test_expect)
+        self.assertStoreEmpty()
+
+    def test_map_by_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results = self.run_ranks(self.rank_controllers(3, chunk=3),
+                                     lambda c: c.map(math_function, *self.map_test_data, tmp_file_path=temp_dir))
+
+            for r in results:
+                self.assertListEqual(r, self.map_test_expect)
+            self.assertListEqual(os.listdir(temp_dir), [])
+        self.assertStoreEmpty()
+
+    def test_map_repeated(self):
+        def _map_twice(c):
+            return [c.map(math_function, *self.map_test_data, tell_children=tc) for tc in (False, True)]
+
+        results = self.run_ranks(self.rank_controllers(3, chunk=3), _map_twice)
+
+        self.assertListEqual(results[0], [self.map_test_expect] * 2)
+        for r in results[1:]:
+            self.assertListEqual(r, [None, self.map_test_expect])
+        self.assertStoreEmpty()
+
+
+class TestOwnRanges(TestKVSStub):
+    n = 500
+
+    def drain(self, claims, chunk):
+        # Check the ranges one process claimed until the counter passed the end of the tasks, clipped to the tasks
+        used = []
+        for lower, upper in claims:
+            self.assertLessEqual(upper - lower, chunk * kvs_controller.MAX_CHUNK_GROWTH)
+            if lower < self.n:
+                used.append((lower, min(upper, self.n)))
+            if upper >= self.n:
+                break
+        return used
+
+    def assertClaimedOnce(self, used_ranges):
+        claimed = [i for lower, upper in used_ranges for i in range(lower, upper)]
+        self.assertListEqual(sorted(claimed), list(range(self.n)))
+        self.assertTrue(all(0 <= lower < upper <= self.n for lower, upper in used_ranges))
+
+    def test_uncontended_claims_dont_grow(self):
+        claims = kvs_controller.ownRanges(StubKVS(self.store), 0, chunk=3, kvs_key="count")
+        used = self.drain(claims, 3)
+
+        self.assertClaimedOnce(used)
+        self.assertTrue(all(upper - lower == 3 for lower, upper in used[:-1]))
+
+    def test_interleaved_claims_grow_to_limit(self):
+        # Claim round-robin so every claim after the first is contended
+        chunk = 2
+        claims = [kvs_controller.ownRanges(StubKVS(self.store), r, chunk=chunk, kvs_key="count") for r in range(3)]
+        used, sizes, done = [], [], [False] * 3
+
+        while not all(done):
+            for r in range(3):
+                if done[r]:
+                    continue
+                lower, upper = next(claims[r])
+                sizes.append(upper - lower)
+                if lower < self.n:
+                    used.append((lower, min(upper, self.n)))
+                done[r] = upper >= self.n
+
+        self.assertClaimedOnce(used)
+        self.assertEqual(max(sizes), chunk * kvs_controller.MAX_CHUNK_GROWTH)
+
+    def test_max_chunk(self):
+        claims = [kvs_controller.ownRanges(StubKVS(self.store), r, chunk=2, kvs_key="count", max_chunk=5)
+                  for r in range(2)]
+        sizes = [upper - lower for _ in range(10) for lower, upper in (next(claims[0]), next(claims[1]))]
+        self.assertEqual(max(sizes), 5)
+
+    def test_concurrent_claims(self):
+        for tasks in (2, 3):
+            with self.subTest(tasks=tasks):
+                self.store = StubKVSStore()
+                results = self.run_ranks(list(range(tasks)), lambda r: self.drain(
+                    kvs_controller.ownRanges(StubKVS(self.store), r, chunk=4, kvs_key="count"), 4))
+                self.assertClaimedOnce([rng for used in results for rng in used])
+
+
+class TestSyncProcesses(TestKVSStub):
+
+    def barrier_rounds(self, tasks, rounds=2, delay=0.01):
+        # Every process enters each barrier in turn and records whether anyone was missing when it left
+        entered = [set() for _ in range(rounds)]
+        lock = threading.Lock()
+
+        def _sync(c):
+            early_exits = []
+            for k in range(rounds):
+                # Hold back all but the master so it races ahead into the next barrier as soon as it can
+                if c.rank != 0:
+                    time.sleep(random.random() * delay)
+                with lock:
+                    entered[k].add(c.rank)
+                c.sync_processes()
+                with lock:
+                    early_exits.append(len(entered[k]) < tasks)
+            return early_exits
+
+        return self.run_ranks(self.rank_controllers(tasks), _sync)
+
+    def test_barrier(self):
+        for tasks in (2, 3, 5):
+            with self.subTest(tasks=tasks):
+                for _ in range(5):
+                    early_exits = self.barrier_rounds(tasks, rounds=4)
+                    self.assertFalse(any(any(e) for e in early_exits))
+                    self.assertStoreEmpty()
+
+    def test_barrier_warns_on_mismatch(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.run_ranks(self.rank_controllers(3), lambda c: c.sync_processes(value=c.rank == 1))
+
+        self.assertGreater(len(caught), 0)
+        self.assertStoreEmpty()
+
+
+class FailingStubKVS(StubKVS):
+
+    def get(self, key):
+        if key == "bad_key":
+            raise RuntimeError("Get failed")
+        return super(FailingStubKVS, self).get(key)
+
+
+class TestGetKeys(TestKVSStub):
+
+    def setUp(self):
+        super(TestGetKeys, self).setUp()
+        [self.controller] = self.rank_controllers(1)
+
+        # Values are put in reverse so that they can't come back in key order by accident
+        self.keys = ["key_{i}".format(i=i) for i in range(10)]
+        for i, k in reversed(list(enumerate(self.keys))):
+            self.controller.put_key(k, i)
+
+    def test_get_keys(self):
+        with unittest.mock.patch.object(kvs_controller, "MAX_PILEUP_CONNECTIONS", 3):
+            values = self.controller.get_keys(self.keys)
+
+        self.assertListEqual(values, list(range(10)))
+        self.assertEqual(len(self.controller._connection_pool), 3)
+        self.assertStoreEmpty()
+
+    def test_get_keys_transform(self):
+        with unittest.mock.patch.object(kvs_controller, "MAX_PILEUP_CONNECTIONS", 3):
+            values = self.controller.get_keys(self.keys, transform=lambda x: x * 2)
+
+        self.assertListEqual(values, list(range(0, 20, 2)))
+        self.assertStoreEmpty()
+
+    def test_get_keys_more_connections_than_keys(self):
+        values = self.controller.get_keys(self.keys[:4])
+
+        self.assertListEqual(values, list(range(4)))
+        self.assertEqual(len(self.controller._connection_pool), 4)
+        self.assertListEqual(self.controller.get_keys([]), [])
+
+    def test_get_keys_reuses_connections(self):
+        with unittest.mock.patch.object(kvs_controller, "MAX_PILEUP_CONNECTIONS", 3):
+            first_connections = list(self.controller._connections(3))
+            self.assertListEqual(self.controller.get_keys(self.keys), list(range(10)))
+
+        self.assertListEqual(self.controller._connection_pool, first_connections)
+
+    def test_get_keys_failed_get(self):
+        self.controller.put_key("bad_key", None)
+
+        with unittest.mock.patch.object(kvs_controller, "KVSClient", FailingStubKVS), \
+                unittest.mock.patch.object(kvs_controller, "MAX_PILEUP_CONNECTIONS", 3):
+            with self.assertRaises(RuntimeError):
+                self.run_ranks([self.controller], lambda c: c.get_keys(self.keys[:5] + ["bad_key"] + self.keys[5:]))
+
+    def test_get_keys_failed_transform(self):
+        def _transform(x):
+            if x == 7:
+                raise ValueError("Transform failed")
+            return x
+
+        with self.assertRaises(ValueError):
+            self.run_ranks([self.controller], lambda c: c.get_keys(self.keys, transform=_transform))
+
+
+@unittest.skipIf(not TEST_KVS, "KVS not installed")
+class TestPayload(unittest.TestCase):
+    data = [(0, list(range(100))), (100, ["a", "b", None])]
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.temp_dir = temp_dir.name
+        self.addCleanup(temp_dir.cleanup)
+
+    def test_inline_payload(self):
+        payload = kvs_controller._dump_payload(self.data, self.temp_dir)
+
+        self.assertIsInstance(payload, bytes)
+        self.assertListEqual(os.listdir(self.temp_dir), [])
+        self.assertListEqual(kvs_controller._load_payload(payload, remove=True), self.data)
+
+        kvs_controller._remove_payload(payload)
+        kvs_controller._remove_payload(None)
+
+    def test_file_payload(self):
+        with unittest.mock.patch.object(kvs_controller, "MAX_KVS_PAYLOAD_SIZE", 8):
+            payload = kvs_controller._dump_payload(self.data, self.temp_dir)
+
+        self.assertNotIsInstance(payload, bytes)
+        self.assertListEqual(os.listdir(self.temp_dir), [os.path.basename(payload)])
+        self.assertListEqual(kvs_controller._load_payload(payload), self.data)
+        self.assertListEqual(kvs_controller._load_payload(payload), self.data)
+
+        kvs_controller._remove_payload(payload)
+        self.assertListEqual(os.listdir(self.temp_dir), [])
+
+    def test_file_payload_load_and_remove(self):
+        with unittest.mock.patch.object(kvs_controller, "MAX_KVS_PAYLOAD_SIZE", 8):
+            payload = kvs_controller._dump_payload(self.data, self.temp_dir)
+
+        self.assertListEqual(kvs_controller._load_payload(payload, remove=True), self.data)
+        self.assertListEqual(os.listdir(self.temp_dir), [])
+
+
+class TestKVSMapByFile(TestKVSStub):
+    map_test_data = [list(range(100)), list(range(100, 200))]
+    map_test_expect = [math_function(x, y) for x, y in zip(*map_test_data)]
+
+    def test_map_spills_to_file(self):
+        dumped, dump_payload = [], kvs_controller._dump_payload
+
+        # Keep track of every payload that gets sent
+        def _dump_payload(data, tmp_file_path):
+            payload = dump_payload(data, tmp_file_path)
+            dumped.append(payload)
+            return payload
+
+        # Spill every payload (even the empty results of a process that didn't get any tasks) to a file
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                unittest.mock.patch.object(kvs_controller, "MAX_KVS_PAYLOAD_SIZE", 0), \
+                unittest.mock.patch.object(kvs_controller, "_dump_payload", _dump_payload):
+            results = self.run_ranks(self.rank_controllers(3, chunk=3),
+                                     lambda c: c.map(math_function, *self.map_test_data, tmp_file_path=temp_dir))
+
+            for r in results:
+                self.assertListEqual(r, self.map_test_expect)
+
+            # Two processes sent their results and the master sent the final data, all through files
+            self.assertEqual(len(dumped), 3)
+            self.assertTrue(all(os.path.dirname(p) == temp_dir for p in dumped))
+            self.assertListEqual(os.listdir(temp_dir), [])
+
+        self.assertStoreEmpty()
+
+
+@unittest.skipIf(not TEST_KVS, "KVS not installed")
+class TestAssembleChunks(unittest.TestCase):
+
+    def test_in_order(self):
+        chunks = [(0, [0, 1, 2]), (3, [3, 4, 5]), (6, [6])]
+        self.assertListEqual(kvs_controller._assemble_chunks(chunks), list(range(7)))
+
+    def test_out_of_order(self):
+        chunks = [(6, [6]), (0, [0, 1, 2]), (3, [3, 4, 5])]
+        self.assertListEqual(kvs_controller._assemble_chunks(chunks), list(range(7)))
+
+    def test_empty_ranks(self):
+        # The master extends its own chunks with each process's chunks, and a process can finish without any
+        chunks = [] + [(2, [2, 3])] + [] + [(0, [0, 1])] + []
+        self.assertListEqual(kvs_controller._assemble_chunks(chunks), list(range(4)))
+        self.assertListEqual(kvs_controller._assemble_chunks([]), [])
+
+    def test_uneven_chunks(self):
+        # Chunks grow when the counter is contended, so each process can end up with different chunk sizes
+        chunks = [(0, [0, 1]), (5, [5, 6, 7, 8, 9, 10, 11, 12]), (2, [2, 3, 4]), (13, [13]), (14, list(range(14, 30)))]
+        self.assertListEqual(kvs_controller._assemble_chunks(chunks[::-1]), list(range(30)))
+        self.assertListEqual(kvs_controller._assemble_chunks(chunks), list(range(30)))
+
+    def test_none_results(self):
+        # Results that are None can't be confused with unfilled positions
+        chunks = [(2, [None, "c"]), (0, ["a", None])]
+        self.assertListEqual(kvs_controller._assemble_chunks(chunks), ["a", None, None, "c"])
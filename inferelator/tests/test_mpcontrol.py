@@ -132,9 +132,13 @@ class TestKVSMPController(TestMPControl):
         MPControl.set_multiprocess_engine(cls.name)
         MPControl.connect(host=cls.server.cinfo[0], port=cls.server.cinfo[1])
 
+        # Run everything through the server even though this is the only process
+        kvs_controller.KVSController.single_task_bypass = False
+
     @classmethod
     @unittest.skipIf(not TEST_KVS, "KVS not installed")
     def tearDownClass(cls):
+        kvs_controller.KVSController.single_task_bypass = True
         super(TestKVSMPController, cls).tearDownClass()
         if cls.server is not None:
             cls.server.shutdown()
@@ -187,6 +191,15 @@ class TestMultiprocessingMPController(TestMPControl):
         test_result = MPControl.map(math_function, *self.map_test_data)
         self.assertListEqual(test_result, self.map_test_expect)
 
+    def test_mp_map_closure(self):
+        offset = 10
+        test_result = MPControl.map(lambda x, y, z: math_function(x, y, z) + offset, *self.map_test_data)
+        self.assertListEqual(test_result, [x + offset for x in self.map_test_expect])
+
+    def test_mp_connect_bad_kwargs(self):
+        with self.assertRaises(ValueError):
+            multiprocessing_controller.MultiprocessingController.connect(maxtasksperchild=1)
+
     def test_mp_sync(self):
         self.assertTrue(MPControl.sync_processes())
 
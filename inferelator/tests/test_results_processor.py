@@ -11,33 +11,90 @@ import pandas.testing as pdt
 import numpy as np
 import os
 import tempfile
-import shutil
 
 import logging
 logging.getLogger('matplotlib').setLevel(logging.ERROR)
 import matplotlib.pyplot as plt
 
+# Build the labels once; DataFrames can share these immutable Index objects
+_GENES = pd.Index(['gene1', 'gene2'])
+_GENES_UNALIGNED = pd.Index(['gene1', 'gene3'])
+_GENE1 = pd.Index(['gene1'])
+_TFS = pd.Index(['tf1', 'tf2'])
+_TF3 = pd.Index(['tf1', 'tf2', 'tf3'])
+_TF5 = pd.Index(['tf1', 'tf2', 'tf3', 'tf4', 'tf5'])
+
+
+def _df(arr, rows, cols):
+    return pd.DataFrame(arr, index=rows, columns=cols)
+
+
+def _arr(*rows):
+    # Fill a preallocated float64 buffer instead of having np.array infer the dtype from the literals
+    buf = np.empty((len(rows), len(rows[0])), dtype=np.float64)
+    buf.flat = [v for row in rows for v in row]
+    return buf
+
+
+_PR_CONFIDENCES = _df(np.array([[0, 1], [0.5, 0]]), _GENES, _TFS)
+_OFF_CONFIDENCES = _df(np.array([[1, 0], [0.5, 0.1]]), _GENES, _TFS)
+_BAD_CONFIDENCES = _df(np.array([[1, 0], [0, 0.5]]), _GENES, _TFS)
+_PERFECT_CONFIDENCES = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
+
+# (name, gold standard, confidences, transform_ties, expected recall, expected precision, precision comparison)
+PR_CASES = [
+    ("perfect_prediction", _df([[0, 1], [1, 0]], _GENES, _TFS), _PR_CONFIDENCES, None,
+     [0., 0.5, 1., 1., 1.], [1., 1., 1., 7. / 12, 7. / 12], np.testing.assert_array_almost_equal),
+    ("unaligned_prediction", _df([[0, 1], [0, 0]], _GENES_UNALIGNED, _TFS), _PR_CONFIDENCES, None,
+     [0., 1., 1., 1., 1.], [1., 1., 0.5, 1. / 3, 0.25], np.testing.assert_array_equal),
+    ("prediction_off", _df(np.array([[1, 0], [0, 1]]), _GENES, _TFS), _OFF_CONFIDENCES, None,
+     [0., 0.5, 0.5, 1., 1.], [1., 1., 0.5, 2. / 3, 0.5], np.testing.assert_array_equal),
+    ("bad_prediction", _df(np.array([[0, 1], [1, 0]]), _GENES, _TFS), _BAD_CONFIDENCES, 'mean',
+     [0., 0., 0., 0.75, 0.75], [0., 0., 0., 5. / 12, 5. / 12], np.testing.assert_array_almost_equal),
+    ("negative_gs_bad_prediction", _df(np.array([[0, -1], [-1, 0]]), _GENES, _TFS), _BAD_CONFIDENCES, 'mean',
+     [0., 0., 0., 0.75, 0.75], [0., 0., 0., 5. / 12, 5. / 12], np.testing.assert_array_almost_equal)
+]
+
+# (name, gold standard, confidences, expected aupr, aupr comparison)
+AUPR_CASES = [
+    ("perfect_prediction", _df(np.array([[1, 0], [1, 0]]), _GENES, _TFS), _PERFECT_CONFIDENCES, 1.0,
+     np.testing.assert_equal),
+    ("negative_gs_perfect_prediction", _df(np.array([[-1, 0], [-1, 0]]), _GENES, _TFS), _PERFECT_CONFIDENCES, 1.0,
+     np.testing.assert_equal),
+    ("prediction_off", _df(np.array([[1, 0], [0, 1]]), _GENES, _TFS), _OFF_CONFIDENCES, 19. / 24,
+     np.testing.assert_equal),
+    ("bad_prediction", _df(np.array([[0, 1], [1, 0]]), _GENES, _TFS), _BAD_CONFIDENCES, 5. / 16,
+     np.testing.assert_approx_equal)
+]
+
 
 class TestResults(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # Build the fixture DataFrames once per class; setUp hands each test shallow copies of them
+        cls._fixtures = dict(
+            # Data was taken from a subset of row 42 of Bacillus subtilis run results
+            beta1=_df(_arr([-0.2841755, 0, 0.2280624, -0.3852462, 0.2545609]), _GENE1, _TF5),
+            rescaled_beta1=_df(_arr([0.09488207, 0, 0.07380172, 0.15597205, 0.07595131]),
+                               _GENE1, _TF5),
+            beta2=_df(_arr([0, 0.2612011, 0.1922999, 0.00000000, 0.19183277]), _GENE1, _TF5),
+            rescaled_beta2=_df(_arr([0, 0.09109101, 0.05830292, 0.00000000, 0.3675702]),
+                               _GENE1, _TF5),
+
+            # Toy data
+            beta=_df(_arr([0, 1], [0.5, 0.05]), _GENES, _TFS),
+            beta_resc=_df(_arr([0, 1.1], [1, 0.05]), _GENES, _TFS),
+            prior=_df([[0, 1], [1, 0]], _GENES, _TFS),
+
+            gold_standard=_df([[0, 1], [1, 0]], _GENES, _TFS),
+            gold_standard_unaligned=_df([[0, 1], [0, 0]], _GENES_UNALIGNED, _TFS)
+        )
+
     def setUp(self):
-        # Data was taken from a subset of row 42 of Bacillus subtilis run results
-        self.beta1 = pd.DataFrame(np.array([[-0.2841755, 0, 0.2280624, -0.3852462, 0.2545609]]), ['gene1'],
-                                  ['tf1', 'tf2', 'tf3', 'tf4', 'tf5'])
-        self.rescaled_beta1 = pd.DataFrame(np.array([[0.09488207, 0, 0.07380172, 0.15597205, 0.07595131]]), ['gene1'],
-                                           ['tf1', 'tf2', 'tf3', 'tf4', 'tf5'])
-        self.beta2 = pd.DataFrame(np.array([[0, 0.2612011, 0.1922999, 0.00000000, 0.19183277]]), ['gene1'],
-                                  ['tf1', 'tf2', 'tf3', 'tf4', 'tf5'])
-        self.rescaled_beta2 = pd.DataFrame(np.array([[0, 0.09109101, 0.05830292, 0.00000000, 0.3675702]]), ['gene1'],
-                                           ['tf1', 'tf2', 'tf3', 'tf4', 'tf5'])
-
-        # Toy data
-        self.beta = pd.DataFrame(np.array([[0, 1], [0.5, 0.05]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        self.beta_resc = pd.DataFrame(np.array([[0, 1.1], [1, 0.05]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        self.prior = pd.DataFrame([[0, 1], [1, 0]], ['gene1', 'gene2'], ['tf1', 'tf2'])
-
-        self.gold_standard = pd.DataFrame([[0, 1], [1, 0]], ['gene1', 'gene2'], ['tf1', 'tf2'])
-        self.gold_standard_unaligned = pd.DataFrame([[0, 1], [0, 0]], ['gene1', 'gene3'], ['tf1', 'tf2'])
+        for name, fixture in self._fixtures.items():
+            setattr(self, name, fixture.copy(deep=False))
+
         self.metric = MetricHandler.get_metric("combined")
 
     def test_output_files(self):
@@ -75,46 +132,46 @@ class TestResultsProcessor(TestResults):
 
     def test_combining_confidences_two_betas_negative_values_assert_nonzero_betas(self):
         _, _, betas_non_zero = results_processor.ResultsProcessor.threshold_and_summarize([self.beta1, self.beta2], 0.5)
-        np.testing.assert_equal(betas_non_zero, np.array([[1, 1, 2, 1, 2]]))
+        np.testing.assert_array_equal(betas_non_zero, np.array([[1, 1, 2, 1, 2]]))
 
     def test_combining_confidences_two_betas_negative_values_assert_sign_betas(self):
         _, betas_sign, _ = results_processor.ResultsProcessor.threshold_and_summarize([self.beta1, self.beta2], 0.5)
-        np.testing.assert_equal(betas_sign, np.array([[-1, 1, 2, -1, 2]]))
+        np.testing.assert_array_equal(betas_sign, np.array([[-1, 1, 2, -1, 2]]))
 
     def test_threshold_and_summarize_one_beta(self):
-        beta1 = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta1 = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
         thresholded_mat, _, _ = results_processor.ResultsProcessor.threshold_and_summarize([beta1], 0.5)
-        np.testing.assert_equal(thresholded_mat.values, np.array([[1, 0], [1, 0]]))
+        np.testing.assert_array_equal(thresholded_mat.values, np.array([[1, 0], [1, 0]]))
 
     def test_threshold_and_summarize_two_betas(self):
-        beta1 = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        beta2 = pd.DataFrame(np.array([[0, 0], [0.5, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta1 = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
+        beta2 = _df(np.array([[0, 0], [0.5, 1]]), _GENES, _TFS)
         thresholded_mat, _, _ = results_processor.ResultsProcessor.threshold_and_summarize([beta1, beta2], 0.5)
-        np.testing.assert_equal(thresholded_mat.values,
-                                np.array([[1, 0], [1, 1]]))
+        np.testing.assert_array_equal(thresholded_mat.values,
+                                      np.array([[1, 0], [1, 1]]))
 
     def test_threshold_and_summarize_three_betas(self):
-        beta1 = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        beta2 = pd.DataFrame(np.array([[0, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        beta3 = pd.DataFrame(np.array([[0.5, 0.2], [0.5, 0.1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta1 = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
+        beta2 = _df(np.array([[0, 0], [0.5, 0]]), _GENES, _TFS)
+        beta3 = _df(np.array([[0.5, 0.2], [0.5, 0.1]]), _GENES, _TFS)
         thresholded_mat, _, _ = results_processor.ResultsProcessor.threshold_and_summarize([beta1, beta2, beta3], 0.5)
-        np.testing.assert_equal(thresholded_mat.values,
-                                np.array([[1, 0], [1, 0]]))
+        np.testing.assert_array_equal(thresholded_mat.values,
+                                      np.array([[1, 0], [1, 0]]))
 
     def test_threshold_and_summarize_three_betas_negative_values(self):
-        beta1 = pd.DataFrame(np.array([[1, 0], [-0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        beta2 = pd.DataFrame(np.array([[0, 0], [-0.5, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        beta3 = pd.DataFrame(np.array([[-0.5, 0.2], [-0.5, 0.1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta1 = _df(np.array([[1, 0], [-0.5, 0]]), _GENES, _TFS)
+        beta2 = _df(np.array([[0, 0], [-0.5, 1]]), _GENES, _TFS)
+        beta3 = _df(np.array([[-0.5, 0.2], [-0.5, 0.1]]), _GENES, _TFS)
         thresholded_mat, _, _ = results_processor.ResultsProcessor.threshold_and_summarize([beta1, beta2, beta3], 0.5)
-        np.testing.assert_equal(thresholded_mat.values,
-                                np.array([[1, 0], [1, 1]]))
+        np.testing.assert_array_equal(thresholded_mat.values,
+                                      np.array([[1, 0], [1, 1]]))
 
     def test_mean_and_median(self):
-        beta1 = pd.DataFrame(np.array([[1, 1], [1, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        beta2 = pd.DataFrame(np.array([[2, 2], [2, 2]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta1 = _df(np.array([[1, 1], [1, 1]]), _GENES, _TFS)
+        beta2 = _df(np.array([[2, 2], [2, 2]]), _GENES, _TFS)
         mean, median = results_processor.ResultsProcessor.mean_and_median([beta1, beta2])
-        np.testing.assert_equal(mean, np.array([[1.5, 1.5], [1.5, 1.5]]))
-        np.testing.assert_equal(median, np.array([[1.5, 1.5], [1.5, 1.5]]))
+        np.testing.assert_array_equal(mean, np.array([[1.5, 1.5], [1.5, 1.5]]))
+        np.testing.assert_array_equal(median, np.array([[1.5, 1.5], [1.5, 1.5]]))
 
 
 class TestNetworkCreator(TestResults):
@@ -135,18 +192,17 @@ class TestNetworkCreator(TestResults):
         self.assertListEqual(net['combined_confidences'].tolist(), [0.6, 0.3, 0.1])
 
     def test_network_summary(self):
-        temp_dir = tempfile.mkdtemp()
-        net = results_processor.ResultsProcessor.process_network(self.pr_calc, self.prior,
-                                                                 beta_threshold=self.beta_threshold)
-        result = results_processor.InferelatorResults(net, self.beta_threshold, self.pr_calc.all_confidences,
-                                                      self.pr_calc)
-        result.write_result_files(temp_dir)
-        processed_data = pd.read_csv(os.path.join(temp_dir, "network.tsv.gz"), sep="\t", index_col=None, header=0)
-        self.assertEqual(processed_data.shape[0], 3)
-        self.assertListEqual(processed_data['regulator'].tolist(), ['tf5', 'tf4', 'tf1'])
-        self.assertListEqual(processed_data['target'].tolist(), ['gene1'] * 3)
-        self.assertListEqual(processed_data['combined_confidences'].tolist(), [0.6, 0.3, 0.1])
-        shutil.rmtree(temp_dir)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            net = results_processor.ResultsProcessor.process_network(self.pr_calc, self.prior,
+                                                                     beta_threshold=self.beta_threshold)
+            result = results_processor.InferelatorResults(net, self.beta_threshold, self.pr_calc.all_confidences,
+                                                          self.pr_calc)
+            result.write_result_files(temp_dir)
+            processed_data = pd.read_csv(os.path.join(temp_dir, "network.tsv.gz"), sep="\t", index_col=None, header=0)
+            self.assertEqual(processed_data.shape[0], 3)
+            self.assertListEqual(processed_data['regulator'].tolist(), ['tf5', 'tf4', 'tf1'])
+            self.assertListEqual(processed_data['target'].tolist(), ['gene1'] * 3)
+            self.assertListEqual(processed_data['combined_confidences'].tolist(), [0.6, 0.3, 0.1])
 
 
 class TestRankSummary(TestResults):
@@ -164,38 +220,37 @@ class TestRankSummary(TestResults):
 
     def test_combining_confidences_one_beta(self):
         # rescaled betas are only in the
-        beta = pd.DataFrame(np.array([[0.5, 0], [0.5, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta = _df(np.array([[0.5, 0], [0.5, 1]]), _GENES, _TFS)
         confidences = self.metric.compute_combined_confidences([beta])
-        np.testing.assert_equal(confidences.values,
-                                np.array([[0.5, 0.0], [0.5, 1.0]]))
+        np.testing.assert_array_equal(confidences.values,
+                                      np.array([[0.5, 0.0], [0.5, 1.0]]))
 
     def test_combining_confidences_one_beta_invariant_to_rescale_division(self):
         # rescaled betas are only in the
-        beta = pd.DataFrame(np.array([[1, 0], [1, 2]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        beta = _df(np.array([[1, 0], [1, 2]]), _GENES, _TFS)
         rescaled_beta = beta / 3.0
         confidences = self.metric.compute_combined_confidences([rescaled_beta])
-        np.testing.assert_equal(confidences.values,
-                                np.array([[0.5, 0.0], [0.5, 1.0]]))
+        np.testing.assert_array_equal(confidences.values,
+                                      np.array([[0.5, 0.0], [0.5, 1.0]]))
 
     def test_combining_confidences_one_beta_all_negative_values(self):
         # rescaled betas are only in the
-        beta = pd.DataFrame(np.array([[-1, -.5, -3], [-1, -2, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2', 'tf3'])
-        rescaled_beta = pd.DataFrame([[0.2, 0.1, 0.4], [0.3, 0.5, 0]], ['gene1', 'gene2'], ['tf1', 'tf2', 'tf3'])
+        rescaled_beta = _df([[0.2, 0.1, 0.4], [0.3, 0.5, 0]], _GENES, _TF3)
         confidences = self.metric.compute_combined_confidences([rescaled_beta])
-        np.testing.assert_equal(confidences.values,
-                                np.array([[0.4, 0.2, 0.8], [0.6, 1.0, 0]]))
+        np.testing.assert_array_equal(confidences.values,
+                                      np.array([[0.4, 0.2, 0.8], [0.6, 1.0, 0]]))
 
     def test_combining_confidences_one_beta_with_negative_values(self):
         confidences = self.metric.compute_combined_confidences([self.rescaled_beta1])
-        np.testing.assert_equal(confidences.values, np.array([[0.75, 0, 0.25, 1, 0.5]]))
+        np.testing.assert_array_equal(confidences.values, np.array([[0.75, 0, 0.25, 1, 0.5]]))
 
     def test_combining_confidences_two_betas_negative_values(self):
         confidences = self.metric.compute_combined_confidences([self.rescaled_beta1, self.rescaled_beta2])
-        np.testing.assert_equal(confidences.values, np.array([[0.1, 0., 0., 0.3, 0.6]]))
+        np.testing.assert_array_equal(confidences.values, np.array([[0.1, 0., 0., 0.3, 0.6]]))
 
     def test_filter_to_left_size_equal(self):
-        left = pd.DataFrame(np.array([[1, 1], [2, 2]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        right = pd.DataFrame(np.array([[0, 0], [2, 2]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        left = _df(np.array([[1, 1], [2, 2]]), _GENES, _TFS)
+        right = _df(np.array([[0, 0], [2, 2]]), _GENES, _TFS)
 
         data = self.make_PR_data(left, right)
         filter_data = self.metric.filter_to_left_size(GOLD_STANDARD_COLUMN, CONFIDENCE_COLUMN, data)
@@ -217,82 +272,21 @@ class TestPrecisionRecallMetric(TestResults):
 
     ####################
 
-    def test_precision_recall_perfect_prediction(self):
-        gs = self.gold_standard.copy()
-        confidences = pd.DataFrame(np.array([[0, 1], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        recall, precision = self.metric.modify_pr(data)
-        np.testing.assert_equal(recall, [0., 0.5, 1., 1., 1.])
-        np.testing.assert_array_almost_equal(precision, [1., 1., 1., 7. / 12, 7. / 12])
-
-    def test_precision_recall_unaligned_prediction(self):
-        gs = self.gold_standard_unaligned.copy()
-        confidences = pd.DataFrame(np.array([[0, 1], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        recall, precision = self.metric.modify_pr(data)
-        np.testing.assert_equal(recall, [0., 1., 1., 1., 1.])
-        np.testing.assert_equal(precision, [1., 1., 0.5, 1. / 3, 0.25])
-
-    def test_precision_recall_prediction_off(self):
-        gs = pd.DataFrame(np.array([[1, 0], [0, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0.1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        recall, precision = self.metric.modify_pr(data)
-        np.testing.assert_equal(recall, [0., 0.5, 0.5, 1., 1.])
-        np.testing.assert_equal(precision, [1., 1., 0.5, 2. / 3, 0.5])
-
-    def test_precision_recall_bad_prediction(self):
-        gs = pd.DataFrame(np.array([[0, 1], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0, 0.5]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data, transform_ties='mean')
-        recall, precision = self.metric.modify_pr(data)
-        np.testing.assert_equal(recall, [0., 0., 0., 0.75, 0.75])
-        np.testing.assert_array_almost_equal(precision, [0., 0., 0., 5. / 12, 5. / 12])
-
-    def test_aupr_perfect_prediction(self):
-        gs = pd.DataFrame(np.array([[1, 0], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        aupr = self.metric.calculate_aupr(data)
-        np.testing.assert_equal(aupr, 1.0)
-
-    def test_negative_gs_aupr_perfect_prediction(self):
-        gs = pd.DataFrame(np.array([[-1, 0], [-1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        aupr = self.metric.calculate_aupr(data)
-        np.testing.assert_equal(aupr, 1.0)
-
-    def test_negative_gs_precision_recallbeta_resc_bad_prediction(self):
-        gs = pd.DataFrame(np.array([[0, -1], [-1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0, 0.5]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data, transform_ties='mean')
-        recall, precision = self.metric.modify_pr(data)
-        np.testing.assert_equal(recall, [0., 0., 0., 0.75, 0.75])
-        np.testing.assert_array_almost_equal(precision, [0., 0., 0., 5. / 12, 5. / 12])
-
-    def test_aupr_prediction_off(self):
-        gs = pd.DataFrame(np.array([[1, 0], [0, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0.1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        aupr = self.metric.calculate_aupr(data)
-        np.testing.assert_equal(aupr, 19. / 24)
-
-    def test_aupr_bad_prediction(self):
-        gs = pd.DataFrame(np.array([[0, 1], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0, 0.5]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        data = self.make_PR_data(gs, confidences)
-        data = self.metric.calculate_precision_recall(data)
-        aupr = self.metric.calculate_aupr(data)
-        np.testing.assert_approx_equal(aupr, 5. / 16)
+    def test_precision_recall(self):
+        for name, gs, confidences, transform_ties, expected_recall, expected_precision, assert_precision in PR_CASES:
+            with self.subTest(case=name):
+                data = self.make_PR_data(gs, confidences)
+                data = self.metric.calculate_precision_recall(data, transform_ties=transform_ties)
+                recall, precision = self.metric.modify_pr(data)
+                np.testing.assert_array_equal(recall, expected_recall)
+                assert_precision(precision, expected_precision)
+
+    def test_aupr(self):
+        for name, gs, confidences, expected_aupr, assert_aupr in AUPR_CASES:
+            with self.subTest(case=name):
+                data = self.make_PR_data(gs, confidences)
+                data = self.metric.calculate_precision_recall(data)
+                assert_aupr(self.metric.calculate_aupr(data), expected_aupr)
 
     def test_rank_sum_increasing(self):
         rankable_data = [pd.DataFrame(np.array([[2.0, 4.0], [6.0, 8.0]]))]
@@ -320,41 +314,39 @@ class TestPrecisionRecallMetric(TestResults):
         np.testing.assert_array_equal(combine_conf, np.array([[0, 0], [0, 0]]))
 
     def test_plot_pr_curve(self):
-        gs = pd.DataFrame(np.array([[-1, 0], [-1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-
-        temp_dir = tempfile.mkdtemp()
-        file_name = os.path.join(temp_dir, "pr_curve.pdf")
-        self.metric = self.metric([confidences, confidences], gs)
-        fig, ax = self.metric.output_curve_pdf(temp_dir, "pr_curve.pdf")
-        self.assertTrue(os.path.exists(file_name))
-        plt.close(fig)
-        
-        os.remove(file_name)
-        self.assertFalse(os.path.exists(file_name))
-        fig, ax = self.metric.output_curve_pdf(output_dir=temp_dir, file_name="pr_curve.pdf")
-        self.assertTrue(os.path.exists(file_name))
-        plt.close(fig)
-
-        os.remove(file_name)
-        self.assertFalse(os.path.exists(file_name))
-        self.metric.curve_file_name = "pr_curve.pdf"
-        fig, ax = self.metric.output_curve_pdf(output_dir=temp_dir, file_name=None)
-        self.assertTrue(os.path.exists(file_name))
-        plt.close(fig)
-
-        os.remove(file_name)
-        self.metric.curve_file_name = None
-        self.assertFalse(os.path.exists(file_name))
-        fig, ax = self.metric.output_curve_pdf(output_dir=temp_dir, file_name=None)
-        self.assertFalse(os.path.exists(file_name))
-        plt.close(fig)
-
-        fig, ax = self.metric.output_curve_pdf(output_dir=None, file_name="pr_curve.pdf")
-        self.assertFalse(os.path.exists(file_name))
-        plt.close(fig)
-
-        shutil.rmtree(temp_dir)
+        gs = _df(np.array([[-1, 0], [-1, 0]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, "pr_curve.pdf")
+            self.metric = self.metric([confidences, confidences], gs)
+            fig, ax = self.metric.output_curve_pdf(temp_dir, "pr_curve.pdf")
+            self.assertTrue(os.path.exists(file_name))
+            plt.close(fig)
+
+            os.remove(file_name)
+            self.assertFalse(os.path.exists(file_name))
+            fig, ax = self.metric.output_curve_pdf(output_dir=temp_dir, file_name="pr_curve.pdf")
+            self.assertTrue(os.path.exists(file_name))
+            plt.close(fig)
+
+            os.remove(file_name)
+            self.assertFalse(os.path.exists(file_name))
+            self.metric.curve_file_name = "pr_curve.pdf"
+            fig, ax = self.metric.output_curve_pdf(output_dir=temp_dir, file_name=None)
+            self.assertTrue(os.path.exists(file_name))
+            plt.close(fig)
+
+            os.remove(file_name)
+            self.metric.curve_file_name = None
+            self.assertFalse(os.path.exists(file_name))
+            fig, ax = self.metric.output_curve_pdf(output_dir=temp_dir, file_name=None)
+            self.assertFalse(os.path.exists(file_name))
+            plt.close(fig)
+
+            fig, ax = self.metric.output_curve_pdf(output_dir=None, file_name="pr_curve.pdf")
+            self.assertFalse(os.path.exists(file_name))
+            plt.close(fig)
 
 
 class TestMCCMetric(TestResults):
@@ -364,20 +356,20 @@ class TestMCCMetric(TestResults):
         self.metric = MetricHandler.get_metric("mcc")
 
     def test_mcc_perfect_prediction(self):
-        gs = pd.DataFrame(np.array([[1, 0], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        gs = _df(np.array([[1, 0], [1, 0]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
         mcc = self.metric([confidences, confidences], gs)
         np.testing.assert_approx_equal(mcc.score()[1], 1.0)
 
     def test_mcc_perfect_inverse_prediction(self):
-        gs = pd.DataFrame(np.array([[0, 1], [0, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        gs = _df(np.array([[0, 1], [0, 1]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [1, 0]]), _GENES, _TFS)
         mcc = self.metric([confidences, confidences], gs)
         np.testing.assert_approx_equal(mcc.score()[1], -1)
 
     def test_mcc_bad_prediction(self):
-        gs = pd.DataFrame(np.array([[0, 1], [0, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0, 0.5]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        gs = _df(np.array([[0, 1], [0, 1]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [0, 0.5]]), _GENES, _TFS)
         mcc = self.metric([confidences, confidences], gs)
         np.testing.assert_approx_equal(mcc.score()[1], 0)
 
@@ -389,23 +381,23 @@ class TestF1Metric(TestResults):
         self.metric = MetricHandler.get_metric("f1")
 
     def test_f1_perfect_prediction(self):
-        gs = pd.DataFrame(np.array([[1, 0], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0.5, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        gs = _df(np.array([[1, 0], [1, 0]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [0.5, 0]]), _GENES, _TFS)
         f1 = self.metric([confidences, confidences], gs)
         np.testing.assert_equal(f1.score()[1], 1.0)
 
     @unittest.skip
     def test_f1_perfect_inverse_prediction(self):
-        gs = pd.DataFrame(np.array([[0, 1], [0, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [1, 0]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        gs = _df(np.array([[0, 1], [0, 1]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [1, 0]]), _GENES, _TFS)
         f1 = self.metric([confidences, confidences], gs)
         print(f1.filtered_data)
         np.testing.assert_approx_equal(f1.score()[1], -1)
 
     @unittest.skip
     def test_f1_bad_prediction(self):
-        gs = pd.DataFrame(np.array([[0, 1], [0, 1]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
-        confidences = pd.DataFrame(np.array([[1, 0], [0, 0.5]]), ['gene1', 'gene2'], ['tf1', 'tf2'])
+        gs = _df(np.array([[0, 1], [0, 1]]), _GENES, _TFS)
+        confidences = _df(np.array([[1, 0], [0, 0.5]]), _GENES, _TFS)
         f1 = self.metric([confidences, confidences], gs)
         print(f1.filtered_data)
         np.testing.assert_approx_equal(f1.score()[1], 0)
@@ -94,6 +94,14 @@ def df_set_diag(df, val, copy=True):
     # Find all the labels that are shared between rows and columns
     isect = df.index.intersection(df.columns)
 
+    # If the labels are unique and the data is a single dtype, build the new dataframe from an array
+    # Positions are looked up once instead of running a label lookup for every shared label
+    if copy and df.index.is_unique and df.columns.is_unique and len(set(df.dtypes)) == 1:
+        arr = df.values
+        arr = np.array(arr, dtype=np.result_type(arr, val))
+        arr[df.index.get_indexer(isect), df.columns.get_indexer(isect)] = val
+        return pd.DataFrame(arr, index=df.index, columns=df.columns)
+
     if copy:
         df = df.copy()
 
@@ -613,8 +621,14 @@ class InferelatorData(object):
         return pd.DataFrame(x, columns=self.gene_names, index=labels) if to_df else x
 
     def get_bootstrap(self, sample_bootstrap_index):
-        return InferelatorData(expression_data=self._adata.X[sample_bootstrap_index, :].copy(),
-                               gene_names=self.gene_names)
+
+        # Fancy indexing with a bootstrap index array already makes a copy
+        # Only copy again if the index was something (like a slice) that returns a view
+        x = self._adata.X[sample_bootstrap_index, :]
+        if not self.is_sparse and np.may_share_memory(x, self._adata.X):
+            x = x.copy()
+
+        return InferelatorData(expression_data=x, gene_names=self.gene_names)
 
     def get_random_samples(self, num_obs, with_replacement=False, random_seed=None, random_gen=None, inplace=False,
                            fix_names=True):
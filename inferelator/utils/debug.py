@@ -68,14 +68,15 @@ def slurm_envs(var_names=None):
         A dict keyed by setattr variable name of the value (or default) from the environment variables
     """
     var_names = SBATCH_VARS.keys() if var_names is None else var_names
-    assert set(var_names).issubset(set(SBATCH_VARS.keys()))
+    assert all(cv in SBATCH_VARS for cv in var_names)
 
+    env = os.environ
     envs = {}
     for cv in var_names:
         os_var, mt, de = SBATCH_VARS[cv]
+        val = env.get(os_var)
         try:
-            val = mt(os.environ[os_var])
-        except (KeyError, TypeError):
-            val = de
-        envs[cv] = val
+            envs[cv] = de if val is None else mt(val)
+        except TypeError:
+            envs[cv] = de
     return envs
\ No newline at end of file
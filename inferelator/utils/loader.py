@@ -199,14 +199,21 @@ class InferelatorDataLoader(object):
 
         # Use any kwargs for this function and any file settings from default
         if self._file_format_settings is not None and filename in self._file_format_settings:
-            file_settings = self._file_format_settings[filename]
+            file_settings = cp.copy(self._file_format_settings[filename])
         else:
             file_settings = cp.copy(DEFAULT_PANDAS_TSV_SETTINGS)
 
         file_settings.update(kwargs)
 
+        # Parse local files from a memory map in a single pass
+        # Leave the engine choice to pandas; regex separators can't be read from a memory map
+        file_path = self.input_path(filename)
+        sep = file_settings.get("sep", file_settings.get("delimiter", ","))
+        if file_settings.get("engine") is None and sep is not None and len(sep) == 1:
+            file_settings.setdefault("memory_map", self._file_exists(file_path))
+
         # Load a dataframe
-        return pd.read_csv(self.input_path(filename), **file_settings)
+        return pd.read_csv(file_path, **file_settings)
 
     def input_path(self, filename):
         """